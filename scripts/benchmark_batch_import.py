@@ -0,0 +1,82 @@
+"""Benchmark importing many tiny CoNLL-U files one by one against importing them in batches.
+
+Generates FILES tiny CoNLL-U files in a temporary directory and reports files per second for
+parsing and saving them with `SparvCoNLLUParser.parse` per file and with
+`SparvCoNLLUParser.parse_batch` per batch file. Scheduling overhead in a full Sparv run comes
+on top of this for every job, so the real gain of batching is larger.
+
+Usage: python scripts/benchmark_batch_import.py [FILES] [TARGET_SIZE]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from sparv.api import Source, SourceFilename
+
+from sbx_conllu.conllu_batch import CONLLU_BATCH_EXTENSION, DEFAULT_TARGET_SIZE, write_batch_files
+from sbx_conllu.conllu_parser import SparvCoNLLUParser
+
+TINY_CONLLU = """\
+# sent_id = {nr}-1
+# text = Hello world!
+1	Hello	hello	INTJ	UH	_	0	root	_	_
+2	world	world	NOUN	NN	Number=Sing	1	vocative	_	SpaceAfter=No
+3	!	!	PUNCT	.	_	1	punct	_	_
+
+# sent_id = {nr}-2
+# text = See you.
+1	See	see	VERB	VB	Mood=Imp	0	root	_	_
+2	you	you	PRON	PRP	Case=Acc	1	obj	_	SpaceAfter=No
+3	.	.	PUNCT	.	_	1	punct	_	_
+
+"""
+
+
+def main() -> None:
+    """Print files per second for the per-file and the batched import."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("num_files", type=int, nargs="?", default=2000, help="number of files to generate")
+    parser.add_argument("target_size", type=int, nargs="?", default=DEFAULT_TARGET_SIZE, help="bytes per batch")
+    args = parser.parse_args()
+    num_files: int = args.num_files
+    target_size: int = args.target_size
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        files_dir = Path("files")
+        batch_dir = Path("batches")
+        files_dir.mkdir()
+        for nr in range(num_files):
+            (files_dir / f"{nr:06d}.conllu").write_text(TINY_CONLLU.format(nr=nr), encoding="utf-8")
+        batch_files = write_batch_files(files_dir, batch_dir, target_size)
+
+        def per_file() -> None:
+            for conllu_file in sorted(files_dir.glob("*.conllu")):
+                parser = SparvCoNLLUParser(Source(str(files_dir)))
+                parser.parse(SourceFilename(conllu_file.stem))
+                parser.save()
+
+        def batched() -> None:
+            for batch_file in batch_files:
+                parser = SparvCoNLLUParser(Source(str(batch_dir)))
+                parser.parse_batch(SourceFilename(batch_file.name.removesuffix(CONLLU_BATCH_EXTENSION)))
+                parser.save()
+
+        print(f"{num_files} files, {len(batch_files)} batches (target size {target_size} bytes)")
+        _report("per file", per_file, num_files)
+        _report("batched", batched, num_files)
+
+
+def _report(name: str, run: Callable[[], None], num_files: int) -> None:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {elapsed:8.2f} s {num_files / elapsed:10.1f} files/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Benchmark the cost of importing the plugin, as Sparv does at plugin discovery.
+
+Sparv has already imported `sparv.api` when it loads the plugin, so every measurement imports
+`sparv.api` first and only times the imports after it, in a fresh interpreter each round.
+
+Usage: python scripts/benchmark_import_time.py [ROUNDS]
+"""
+
+import statistics
+import subprocess
+import sys
+
+MEASUREMENTS = [
+    # what Sparv pays on every invocation
+    ("lazy (plugin registration)", ["sbx_conllu"]),
+    # what the plugin cost when it imported the parser eagerly, and what is paid when the importer runs
+    ("eager (registration + parser)", ["sbx_conllu", "sbx_conllu.conllu_parser"]),
+]
+
+
+def main() -> None:
+    """Print the median import times of the plugin with and without the parser."""
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for name, modules in MEASUREMENTS:
+        elapsed = _median_import_time(modules, rounds)
+        print(f"{name:<32} {elapsed * 1000:8.1f} ms")
+
+
+def _median_import_time(modules: list[str], rounds: int) -> float:
+    imports = "; ".join(f"import {module}" for module in modules)
+    code = f"import time, sparv.api; start = time.perf_counter(); {imports}; print(time.perf_counter() - start)"
+    timings = [
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+        for _ in range(rounds)
+    ]
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    main()
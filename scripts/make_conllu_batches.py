@@ -0,0 +1,25 @@
+"""Tool for writing batch files for importing many small CoNLL-U files with `sbx_conllu:parse_batch`.
+
+Usage: python scripts/make_conllu_batches.py CONLLU_DIR SOURCE_DIR [TARGET_SIZE]
+"""
+
+import argparse
+from pathlib import Path
+
+from sbx_conllu.conllu_batch import DEFAULT_TARGET_SIZE, write_batch_files
+
+
+def main() -> None:
+    """Write batch files for all CoNLL-U files in the given directory."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("conllu_dir", type=Path, help="directory to search (recursively) for CoNLL-U files")
+    parser.add_argument("source_dir", type=Path, help="directory to write the batch files to")
+    parser.add_argument("target_size", type=int, nargs="?", default=DEFAULT_TARGET_SIZE, help="bytes per batch")
+    args = parser.parse_args()
+
+    batch_files = write_batch_files(args.conllu_dir, args.source_dir, args.target_size)
+    print(f"Wrote {len(batch_files)} batch files to '{args.source_dir}'")
+
+
+if __name__ == "__main__":
+    main()
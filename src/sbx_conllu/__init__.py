@@ -1,5 +1,16 @@
 """Sparv plugin to import CoNLL-U files."""
 
+from sparv.api import Config
+
 from . import conllu_import
 
 __all__ = ["conllu_import"]
+
+__config__ = [
+    Config(
+        "sbx_conllu.import_attributes",
+        ["text"],
+        description="List of attributes that is needed for other analysis.",
+        datatype=list[str],
+    )
+]
@@ -0,0 +1,263 @@
+"""Command line tool for importing CoNLL-U files to a Sparv work directory without running Sparv.
+
+Writes the same files as the importers `sbx_conllu:parse` and `sbx_conllu:parse_batch`, using a
+pool of processes. Finished source files are recorded, with their modification time and size, in a
+log in the corpus directory, so an interrupted import can be resumed by running the same command
+again. Warnings from the workers are written to a log file in the corpus directory.
+
+Only Sparv's default compression of the work directory files (gzip) is supported.
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import time
+import typing as t
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from .conllu_batch import CONLLU_BATCH_EXTENSION, read_batch_file
+from .conllu_import import CONLLU_EXTENSION_NAME
+
+DONE_LOG_NAME: str = ".sbx-conllu-import.done"
+WORKER_LOG_NAME: str = ".sbx-conllu-import.log"
+DONE_LOG_HEADER_PREFIX: str = "# "
+SPARV_WORKDIR_NAME: str = "sparv-workdir"
+SPARV_DEFAULT_COMPRESSION: str = "gzip"
+
+
+class _ImportResult(t.NamedTuple):
+    filename: str
+    signature: str
+    sentences: int
+    tokens: int
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Import CoNLL-U files from a directory tree to a Sparv work directory.
+
+    Returns:
+        Exit code, 0 if all files were imported.
+    """
+    args = _parse_args(argv)
+    source_dir: Path = args.source_dir.resolve()
+    corpus_dir: Path = args.corpus_dir.resolve()
+    extension = CONLLU_BATCH_EXTENSION if args.batch else f".{CONLLU_EXTENSION_NAME}"
+
+    compression = read_compression(corpus_dir)
+    if compression != SPARV_DEFAULT_COMPRESSION:
+        _print(
+            f"The corpus config sets sparv.compression to '{compression}', "
+            f"but only '{SPARV_DEFAULT_COMPRESSION}' is supported"
+        )
+        return 2
+
+    filenames = find_source_files(source_dir, extension)
+    done_log = corpus_dir / DONE_LOG_NAME
+    header = _done_log_header(source_dir, batch=args.batch)
+    done = read_done_log(done_log, header) if args.resume else {}
+    # only trust the log for unchanged files whose output is still in the work directory
+    done = {
+        filename: signature
+        for filename, signature in done.items()
+        if (corpus_dir / SPARV_WORKDIR_NAME / filename).is_dir()
+        and _unchanged(source_dir, filename, signature, batch=args.batch)
+    }
+    todo = [filename for filename in filenames if filename not in done]
+    if done:
+        _print(f"Skipping {len(filenames) - len(todo)} already imported files")
+
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    with done_log.open("w", encoding="utf-8") as done_fp:
+        done_fp.write(f"{header}\n")
+        done_fp.writelines(f"{filename}\t{done[filename]}\n" for filename in sorted(done))
+
+    start = time.perf_counter()
+    results: list[_ImportResult] = []
+    failed: list[str] = []
+    with (
+        done_log.open("a", encoding="utf-8") as done_fp,
+        ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(corpus_dir,)) as executor,
+    ):
+        pending: dict[Future[_ImportResult], str] = {}
+        remaining = iter(todo)
+        # keep a bounded number of jobs in flight, so huge trees don't fill the memory with futures
+        max_pending = (args.jobs or os.cpu_count() or 1) * 4
+        while True:
+            for filename in remaining:
+                pending[executor.submit(import_source_file, source_dir, filename, args.batch)] = filename
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                filename = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    failed.append(filename)
+                    _print(f"\nFailed to import '{filename}': {exc!r}")
+                else:
+                    results.append(result)
+                    done_fp.write(f"{filename}\t{result.signature}\n")
+                    done_fp.flush()
+            _print(f"\rImported {len(results) + len(failed)}/{len(todo)} files", end="")
+    elapsed = time.perf_counter() - start
+    _print("")
+
+    _print_summary(results, failed, elapsed)
+    return 1 if failed else 0
+
+
+def import_source_file(source_dir: Path, filename: str, batch: bool) -> _ImportResult:
+    """Import one source file to the Sparv work directory in the current directory."""
+    from sparv.api import Source, SourceFilename  # noqa: PLC0415
+
+    from .conllu_parser import SparvCoNLLUParser  # noqa: PLC0415
+
+    # take the signature before parsing, so that a change during the import is seen by the next run
+    signature = source_signature(source_dir, filename, batch=batch)
+    parser = SparvCoNLLUParser(Source(str(source_dir)))
+    if batch:
+        parser.parse_batch(SourceFilename(filename))
+    else:
+        parser.parse(SourceFilename(filename))
+    parser.save()
+    return _ImportResult(filename, signature, len(parser.sentences), len(parser.data["token"]["elements"]))
+
+
+def find_source_files(source_dir: Path, extension: str) -> list[str]:
+    """Find all source files with the given extension, as Sparv source filenames."""
+    return sorted(
+        path.relative_to(source_dir).as_posix().removesuffix(extension)
+        for path in source_dir.glob(f"**/*{extension}")
+        if path.is_file()
+    )
+
+
+def source_signature(source_dir: Path, filename: str, *, batch: bool) -> str:
+    """Return a signature of the modification times and sizes of the files a source file is imported from.
+
+    For a batch file, the signature covers the batch file and all CoNLL-U files listed in it.
+    """
+    if not batch:
+        return _stat_signature(source_dir / f"{filename}.{CONLLU_EXTENSION_NAME}")
+    batch_file = source_dir / f"{filename}{CONLLU_BATCH_EXTENSION}"
+    files = [batch_file, *(batch_file.parent / name for name in read_batch_file(batch_file))]
+    stats = "\n".join(f"{file}\t{_stat_signature(file)}" for file in files)
+    return hashlib.sha1(stats.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def read_done_log(done_log: Path, header: str) -> dict[str, str]:
+    """Read the filenames recorded as imported, if any.
+
+    Args:
+        done_log: the log to read.
+        header: the expected first line of the log, the log is ignored if it differs.
+
+    Returns:
+        The filenames recorded as imported, mapped to the signatures of their sources at import.
+    """
+    if not done_log.exists():
+        return {}
+    with done_log.open(encoding="utf-8") as fp:
+        if fp.readline().rstrip("\n") != header:
+            _print(f"Ignoring '{done_log}', it was written for another source directory or mode")
+            return {}
+        entries = (line.rstrip("\n").partition("\t") for line in fp if line.strip())
+        return {filename: signature for filename, _, signature in entries}
+
+
+def read_compression(corpus_dir: Path) -> str:
+    """Read the compression Sparv uses for the work directory from the corpus config."""
+    config_file = corpus_dir / "config.yaml"
+    if not config_file.exists():
+        return SPARV_DEFAULT_COMPRESSION
+    import yaml  # type: ignore[import-untyped]  # noqa: PLC0415
+
+    with config_file.open(encoding="utf-8") as fp:
+        config = yaml.safe_load(fp) or {}
+    return (config.get("sparv") or {}).get("compression") or SPARV_DEFAULT_COMPRESSION
+
+
+def _init_worker(corpus_dir: Path) -> None:
+    os.chdir(corpus_dir)
+    # keep the parser's warnings out of the progress line on stderr
+    handler = logging.FileHandler(WORKER_LOG_NAME, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s"))
+    root_logger = logging.getLogger()
+    root_logger.handlers = [handler]
+    root_logger.setLevel(logging.WARNING)
+
+
+def _unchanged(source_dir: Path, filename: str, signature: str, *, batch: bool) -> bool:
+    try:
+        return source_signature(source_dir, filename, batch=batch) == signature
+    except OSError:
+        return False
+
+
+def _stat_signature(file: Path) -> str:
+    stat = file.stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _done_log_header(source_dir: Path, *, batch: bool) -> str:
+    mode = "batch" if batch else "conllu"
+    return f"{DONE_LOG_HEADER_PREFIX}source_dir={source_dir} mode={mode}"
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="sbx-conllu-import", description=__doc__)
+    parser.add_argument("source_dir", type=Path, help="directory to search (recursively) for source files")
+    parser.add_argument(
+        "corpus_dir",
+        type=Path,
+        help="corpus directory, the files are written to 'sparv-workdir' in this directory. Only the default "
+        "compression (sparv.compression: gzip) is supported",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=_positive_int, default=None, help="number of processes to use (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--batch", action="store_true", help="import batch files (*.conllubatch) instead of CoNLL-U files"
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help="import all files, also those already imported by an earlier run",
+    )
+    return parser.parse_args(argv)
+
+
+def _print_summary(results: list[_ImportResult], failed: list[str], elapsed: float) -> None:
+    def per_second(count: int) -> float:
+        return count / elapsed if elapsed > 0 else 0.0
+
+    sentences = sum(result.sentences for result in results)
+    tokens = sum(result.tokens for result in results)
+    _print(f"Imported {len(results)} files ({len(failed)} failed) in {elapsed:.2f} s")
+    _print(
+        f"Throughput: {per_second(len(results)):.1f} files/s, "
+        f"{per_second(sentences):.1f} sentences/s, {per_second(tokens):.1f} tokens/s"
+    )
+
+
+def _print(message: str, end: str = "\n") -> None:
+    sys.stderr.write(f"{message}{end}")
+    sys.stderr.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
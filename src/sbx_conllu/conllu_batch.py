@@ -0,0 +1,81 @@
+"""Batch files for importing many small CoNLL-U files as one source file.
+
+A batch file (`*.conllubatch`) lists one CoNLL-U file per line, relative to the directory of
+the batch file. Empty lines and lines starting with `#` are ignored.
+"""
+
+import os
+from collections.abc import Iterable
+from pathlib import Path
+
+CONLLU_BATCH_EXTENSION_NAME: str = "conllubatch"
+CONLLU_BATCH_EXTENSION: str = f".{CONLLU_BATCH_EXTENSION_NAME}"
+DEFAULT_TARGET_SIZE: int = 1024 * 1024
+
+
+def read_batch_file(batch_file: Path) -> list[str]:
+    """Read the CoNLL-U filenames listed in a batch file.
+
+    Args:
+        batch_file: the batch file to read.
+
+    Returns:
+        The listed filenames, relative to the directory of the batch file.
+    """
+    with batch_file.open(encoding="utf-8") as fp:
+        return [line for line in (raw_line.strip() for raw_line in fp) if line and not line.startswith("#")]
+
+
+def group_files(files: Iterable[Path], target_size: int = DEFAULT_TARGET_SIZE) -> list[list[Path]]:
+    """Group files, in the given order, into batches of at most `target_size` bytes.
+
+    A file larger than `target_size` gets a batch of its own.
+
+    Args:
+        files: the files to group.
+        target_size: the maximum total size in bytes of a batch.
+
+    Returns:
+        List of batches of files.
+    """
+    batches: list[list[Path]] = []
+    batch: list[Path] = []
+    batch_size = 0
+    for file in files:
+        size = file.stat().st_size
+        if batch and batch_size + size > target_size:
+            batches.append(batch)
+            batch = []
+            batch_size = 0
+        batch.append(file)
+        batch_size += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def write_batch_files(
+    conllu_dir: Path, batch_dir: Path, target_size: int = DEFAULT_TARGET_SIZE, prefix: str = "batch"
+) -> list[Path]:
+    """Write batch files for all CoNLL-U files under `conllu_dir`.
+
+    Args:
+        conllu_dir: directory to search (recursively) for CoNLL-U files.
+        batch_dir: directory to write the batch files to, typically the source directory of the corpus.
+        target_size: the maximum total size in bytes of the CoNLL-U files in a batch.
+        prefix: prefix of the names of the batch files.
+
+    Returns:
+        The written batch files.
+    """
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    conllu_files = sorted(conllu_dir.glob("**/*.conllu"))
+    batches = group_files(conllu_files, target_size)
+    width = len(str(len(batches)))
+    batch_files = []
+    for nr, batch in enumerate(batches, start=1):
+        batch_file = batch_dir / f"{prefix}-{nr:0{width}d}{CONLLU_BATCH_EXTENSION}"
+        lines = [Path(os.path.relpath(file, batch_dir)).as_posix() for file in batch]
+        batch_file.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+        batch_files.append(batch_file)
+    return batch_files
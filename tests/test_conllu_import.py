@@ -1,3 +1,7 @@
+import itertools
+import shutil
+import subprocess
+import sys
 from pathlib import Path
 from unittest import mock
 
@@ -6,7 +10,11 @@ import pytest
 from sparv.api import Output, Source, SourceFilename, SourceStructure, Text
 from syrupy.assertion import SnapshotAssertion
 
-from sbx_conllu.conllu_import import SparvCoNLLUParser, _find_root, analyze_conllu, parse  # noqa: PLC2701
+from sbx_conllu import bulk_import
+from sbx_conllu.bulk_import import find_source_files, read_done_log
+from sbx_conllu.conllu_batch import group_files, read_batch_file, write_batch_files
+from sbx_conllu.conllu_import import parse
+from sbx_conllu.conllu_parser import SparvCoNLLUParser, _find_root, analyze_conllu  # noqa: PLC2701
 
 # id   form  lemma upostag xpostag           feats  head    deprel deps  misc
 EXAMPLE_NO_TEXT: str = """
@@ -87,3 +95,147 @@ def test_parser_parse(snapshot: SnapshotAssertion) -> None:
     parser.parse(SourceFilename("deprel-cases"))
 
     assert parser.data == snapshot
+
+
+def test_plugin_import_does_not_load_parser() -> None:
+    code = "import sys, sbx_conllu; print('conllu' in sys.modules, 'sbx_conllu.conllu_parser' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_group_files(tmp_path: Path) -> None:
+    sizes = [3, 4, 10, 1, 2]
+    files = []
+    for nr, size in enumerate(sizes):
+        file = tmp_path / f"{nr}.conllu"
+        file.write_text("x" * size, encoding="utf-8")
+        files.append(file)
+
+    batches = group_files(files, target_size=8)
+
+    assert [[file.name for file in batch] for batch in batches] == [
+        ["0.conllu", "1.conllu"],
+        ["2.conllu"],
+        ["3.conllu", "4.conllu"],
+    ]
+
+
+def test_parser_parse_batch(tmp_path: Path) -> None:
+    conllu_dir = Path("assets/texts")
+    batch_files = write_batch_files(conllu_dir, tmp_path, target_size=1024 * 1024)
+    assert len(batch_files) == 1
+    filenames = read_batch_file(batch_files[0])
+
+    parser = SparvCoNLLUParser(Source(str(tmp_path)))
+    parser.parse_batch(SourceFilename(batch_files[0].stem))
+
+    expected_sentences = []
+    for conllu_file in sorted(conllu_dir.glob("*.conllu")):
+        file_parser = SparvCoNLLUParser(Source(str(conllu_dir)))
+        file_parser.parse(SourceFilename(conllu_file.stem))
+        expected_sentences.extend(file_parser.sentences)
+    assert parser.sentences == expected_sentences
+
+    documents = parser.data["document"]["elements"]
+    assert {document["attrs"]["filename"] for document in documents} == set(filenames)
+    assert "filename" in parser.data["document"]["attrs"]
+    for document, next_document in itertools.pairwise(documents):
+        assert document["end"] <= next_document["start"]
+    paragraphs = parser.data["paragraph"]["elements"]
+    assert paragraphs
+    for paragraph in paragraphs:
+        assert any(
+            document["start"] <= paragraph["start"] and paragraph["end"] <= document["end"] for document in documents
+        ), paragraph
+
+
+def test_bulk_import_resumes(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    source_dir = tmp_path / "source"
+    (source_dir / "sub").mkdir(parents=True)
+    shutil.copy("assets/texts/multiword.conllu", source_dir)
+    shutil.copy("assets/texts/space-after-no.conllu", source_dir / "sub")
+    corpus_dir = tmp_path / "corpus"
+    done_log = corpus_dir / bulk_import.DONE_LOG_NAME
+    header = bulk_import._done_log_header(source_dir.resolve(), batch=False)
+
+    assert find_source_files(source_dir, ".conllu") == ["multiword", "sub/space-after-no"]
+
+    assert bulk_import.main([str(source_dir), str(corpus_dir), "--jobs", "1"]) == 0
+    assert read_done_log(done_log, header).keys() == {"multiword", "sub/space-after-no"}
+    assert (corpus_dir / "sparv-workdir" / "multiword").is_dir()
+
+    shutil.copy("assets/texts/empty-node.conllu", source_dir)
+    capsys.readouterr()
+    assert bulk_import.main([str(source_dir), str(corpus_dir), "--jobs", "1"]) == 0
+    assert "Skipping 2 already imported files" in capsys.readouterr().err
+    assert read_done_log(done_log, header).keys() == {"empty-node", "multiword", "sub/space-after-no"}
+
+    # files whose output is gone are imported again
+    shutil.rmtree(corpus_dir / "sparv-workdir" / "multiword")
+    assert bulk_import.main([str(source_dir), str(corpus_dir), "--jobs", "1"]) == 0
+    assert "Skipping 2 already imported files" in capsys.readouterr().err
+
+
+def test_bulk_import_reimports_changed_files(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    shutil.copy("assets/texts/multiword.conllu", source_dir)
+    shutil.copy("assets/texts/empty-node.conllu", source_dir)
+    corpus_dir = tmp_path / "corpus"
+
+    assert bulk_import.main([str(source_dir), str(corpus_dir), "--jobs", "1"]) == 0
+    shutil.copy("assets/texts/space-after-no.conllu", source_dir / "multiword.conllu")
+    capsys.readouterr()
+    assert bulk_import.main([str(source_dir), str(corpus_dir), "--jobs", "1"]) == 0
+    assert "Skipping 1 already imported files" in capsys.readouterr().err
+
+
+def test_bulk_import_ignores_log_from_other_mode(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    batch_header = bulk_import._done_log_header(source_dir, batch=True)
+    conllu_header = bulk_import._done_log_header(source_dir, batch=False)
+    done_log = tmp_path / bulk_import.DONE_LOG_NAME
+    done_log.write_text(f"{batch_header}\nmultiword\t0123abcd\n", encoding="utf-8")
+
+    assert read_done_log(done_log, conllu_header) == {}
+    assert read_done_log(done_log, batch_header) == {"multiword": "0123abcd"}
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1"])
+def test_bulk_import_rejects_non_positive_jobs(tmp_path: Path, jobs: str) -> None:
+    with pytest.raises(SystemExit):
+        bulk_import.main([str(tmp_path), str(tmp_path / "corpus"), "--jobs", jobs])
+
+
+def test_bulk_import_rejects_other_compression(tmp_path: Path) -> None:
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    (corpus_dir / "config.yaml").write_text("sparv:\n  compression: bz2\n", encoding="utf-8")
+
+    assert bulk_import.main([str(tmp_path), str(corpus_dir)]) != 0
+
+
+def test_dephead_index_follows_written_token_order(tmp_path: Path) -> None:
+    # the text of the first sentence is shorter than its forms, so the tokens of the
+    # sentences interleave when sorted: abc, x, d, y
+    (tmp_path / "interleaved.conllu").write_text(
+        "# text = ab\n"
+        "1\tabc\t_\t_\t_\t_\t2\tdep\t_\t_\n"
+        "2\td\t_\t_\t_\t_\t0\troot\t_\t_\n"
+        "\n"
+        "1\tx\t_\t_\t_\t_\t0\troot\t_\t_\n"
+        "2\ty\t_\t_\t_\t_\t1\tdep\t_\t_\n"
+        "\n",
+        encoding="utf-8",
+    )
+    with (
+        mock.patch.object(Text, "write"),
+        mock.patch.object(Output, "write", autospec=True) as output_write_mock,
+        mock.patch.object(SourceStructure, "write"),
+    ):
+        parse(SourceFilename("interleaved"), Source(str(tmp_path)))
+
+    written = {call.args[0].name: call.args[1] for call in output_write_mock.call_args_list}
+    assert [start for start, _ in written["token"]] == [(0, 5), (3, 5), (4, 5), (5, 5)]
+    assert list(written["token:dephead_index_ud"]) == ["2", "", "", "1"]